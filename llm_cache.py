@@ -0,0 +1,267 @@
+"""Cache for structured LLM responses.
+
+Lookups go through two tiers:
+
+1. Exact match: the prompt inputs are canonicalized to JSON and hashed with
+   SHA-256. The hash is the primary key of the ``llm_cache`` table, so a
+   repeat of an identical request is a single indexed read.
+2. Semantic match (optional): callers pass a short text that captures what
+   varies between otherwise equivalent requests (e.g. the user's thought) and
+   a scope naming what must match exactly (e.g. the content it is about).
+   The text is embedded with a sentence-transformers model and compared, in a
+   FAISS inner-product index, only against earlier prompts from the same
+   scope. When the closest one is similar enough, its stored response is
+   reused. The full prompt is never embedded: the model truncates long input,
+   so the parts that differ would be cut off.
+
+Misses call the LLM, or stream from it, and record the response in both tiers. Rows past their
+``expires_at`` are never served and are deleted at most once per purge
+interval, when a new response is stored.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import AsyncIterator, Callable, Dict, Optional, Set, Type, TypeVar, Union
+
+import asyncpg
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_THRESHOLD = 0.87
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_TTL = timedelta(days=7)
+DEFAULT_PURGE_INTERVAL = timedelta(hours=1)
+
+_encoder = None
+
+
+def _get_encoder():
+    # Loaded lazily so the model is only pulled in when the semantic tier is enabled
+    global _encoder
+    if _encoder is None:
+        from sentence_transformers import SentenceTransformer
+        _encoder = SentenceTransformer(EMBEDDING_MODEL)
+    return _encoder
+
+
+def _embed(text: str):
+    return _get_encoder().encode([text], normalize_embeddings=True).astype("float32")
+
+
+def canonicalize(prompt: dict) -> str:
+    return json.dumps(prompt, sort_keys=True, separators=(",", ":"))
+
+
+def cache_key(canonical_prompt: str) -> str:
+    return hashlib.sha256(canonical_prompt.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Exact-match plus optional LRU-bounded semantic cache for one kind of LLM response."""
+
+    def __init__(
+        self,
+        namespace: str,
+        response_model: Type[T],
+        semantic: bool = False,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        store_dir: Optional[str] = None,
+        ttl: timedelta = DEFAULT_TTL,
+        purge_interval: timedelta = DEFAULT_PURGE_INTERVAL,
+    ):
+        self.namespace = namespace
+        self.response_model = response_model
+        self.semantic = semantic
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.store_dir = store_dir
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        self._index = None
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()  # faiss id -> (scope, response JSON)
+        self._scopes: Dict[str, Set[int]] = {}
+        self._next_id = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def _store_path(self) -> str:
+        return os.path.join(self.store_dir, f"{self.namespace}.npz")
+
+    def load(self):
+        """Build the semantic index, restoring it from disk if a previous run saved one."""
+        if not self.semantic:
+            return
+        import faiss
+        import numpy as np
+
+        if self.store_dir and os.path.exists(self._store_path):
+            with np.load(self._store_path) as store:
+                self._index = faiss.deserialize_index(store["index"])
+                data = json.loads(store["entries"].tobytes())
+            for entry_id, scope, response_json in data["entries"]:
+                self._entries[entry_id] = (scope, response_json)
+                self._scopes.setdefault(scope, set()).add(entry_id)
+            self._next_id = data["next_id"]
+            logger.info(f"Loaded {len(self._entries)} cached {self.namespace} responses")
+        else:
+            dim = _get_encoder().get_sentence_embedding_dimension()
+            self._index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+
+    def save(self):
+        """Persist the semantic index and its responses so they survive a restart.
+
+        Index and entries go into one file that is swapped in with an atomic
+        rename, so workers shutting down together never leave a torn or
+        mismatched store behind; the last one to finish wins.
+        """
+        if not self.semantic or self._index is None or not self.store_dir:
+            return
+        import faiss
+        import numpy as np
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        entries = json.dumps({
+            "next_id": self._next_id,
+            "entries": [[entry_id, scope, response_json] for entry_id, (scope, response_json) in self._entries.items()]
+        }).encode()
+        tmp_path = f"{self._store_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, index=faiss.serialize_index(self._index), entries=np.frombuffer(entries, dtype="uint8"))
+        os.replace(tmp_path, self._store_path)
+
+    def _lookup(self, embedding, scope: str) -> Optional[str]:
+        import faiss
+        import numpy as np
+
+        scope_ids = self._scopes.get(scope)
+        if not scope_ids:
+            return None
+        selector = faiss.IDSelectorBatch(np.fromiter(scope_ids, dtype="int64"))
+        scores, ids = self._index.search(embedding, 1, params=faiss.SearchParameters(sel=selector))
+        entry_id = int(ids[0][0])
+        if entry_id == -1 or scores[0][0] < self.threshold:
+            return None
+        self._entries.move_to_end(entry_id)
+        return self._entries[entry_id][1]
+
+    def _insert(self, embedding, scope: str, response_json: str):
+        import numpy as np
+
+        if len(self._entries) >= self.max_entries:
+            evicted_id, (evicted_scope, _) = self._entries.popitem(last=False)
+            self._index.remove_ids(np.array([evicted_id], dtype="int64"))
+            self._scopes[evicted_scope].discard(evicted_id)
+            if not self._scopes[evicted_scope]:
+                del self._scopes[evicted_scope]
+        entry_id = self._next_id
+        self._next_id += 1
+        self._index.add_with_ids(embedding, np.array([entry_id], dtype="int64"))
+        self._entries[entry_id] = (scope, response_json)
+        self._scopes.setdefault(scope, set()).add(entry_id)
+
+    async def _find(self, key: str, pool: asyncpg.Pool, semantic_text: Optional[str], scope: Optional[str]):
+        """Return a cached response (or None) and the embedding to store a miss under."""
+        async with pool.acquire() as conn:
+            cached = await conn.fetchval('''
+                SELECT response FROM llm_cache
+                WHERE key = $1 AND expires_at > now()
+            ''', key)
+        if cached is not None:
+            logger.info(f"Exact cache hit for {self.namespace}")
+            return self.response_model.model_validate(cached), None
+
+        embedding = None
+        use_semantic = self.semantic and semantic_text is not None and scope is not None
+        if use_semantic:
+            embedding = await asyncio.to_thread(_embed, semantic_text)
+            async with self._lock:
+                cached = self._lookup(embedding, scope)
+            if cached is not None:
+                logger.info(f"Semantic cache hit for {self.namespace}")
+                return self.response_model.model_validate_json(cached), embedding
+        return None, embedding
+
+    async def _store(self, key: str, canonical_prompt: str, result: T, pool: asyncpg.Pool, embedding, scope):
+        response_json = result.model_dump_json()
+        if embedding is not None:
+            async with self._lock:
+                self._insert(embedding, scope, response_json)
+
+        async with pool.acquire() as conn:
+            await conn.execute('''
+                INSERT INTO llm_cache (key, namespace, prompt, embedding, response, expires_at)
+                VALUES ($1, $2, $3, $4, $5, now() + $6::interval)
+                ON CONFLICT (key) DO UPDATE
+                SET response = EXCLUDED.response, expires_at = EXCLUDED.expires_at
+            ''', key, self.namespace, canonical_prompt,
+                embedding.tobytes() if embedding is not None else None,
+                response_json, self.ttl)
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + self.purge_interval.total_seconds()
+                await conn.execute('''
+                    DELETE FROM llm_cache WHERE expires_at < now()
+                ''')
+
+    async def get_or_compute(
+        self,
+        prompt: dict,
+        compute_fn: Callable[[], T],
+        pool: asyncpg.Pool,
+        semantic_text: Optional[str] = None,
+        scope: Optional[str] = None,
+    ) -> T:
+        """Return a cached response for this (or a similar) prompt, or compute and store one.
+
+        ``semantic_text`` and ``scope`` enable the semantic tier for this call;
+        without them only exact matches are reused.
+        """
+        canonical_prompt = canonicalize(prompt)
+        key = cache_key(canonical_prompt)
+        cached, embedding = await self._find(key, pool, semantic_text, scope)
+        if cached is not None:
+            return cached
+
+        # LLM calls are blocking, so keep them off the event loop
+        result = await asyncio.to_thread(compute_fn)
+        await self._store(key, canonical_prompt, result, pool, embedding, scope)
+        return result
+
+    async def stream_or_compute(
+        self,
+        prompt: dict,
+        stream_fn: Callable[[], AsyncIterator[Union[str, T]]],
+        pool: asyncpg.Pool,
+        semantic_text: Optional[str] = None,
+        scope: Optional[str] = None,
+    ) -> AsyncIterator[Union[str, T]]:
+        """Like ``get_or_compute``, for an LLM call that streams.
+
+        ``stream_fn`` returns an async iterator of text chunks ending with the
+        parsed response. The chunks are passed through as they arrive and the
+        response is stored before it is yielded; a cache hit yields only the
+        response.
+        """
+        canonical_prompt = canonicalize(prompt)
+        key = cache_key(canonical_prompt)
+        cached, embedding = await self._find(key, pool, semantic_text, scope)
+        if cached is not None:
+            yield cached
+            return
+
+        async for item in stream_fn():
+            if isinstance(item, str):
+                yield item
+            else:
+                await self._store(key, canonical_prompt, item, pool, embedding, scope)
+                yield item
@@ -1,7 +1,7 @@
-from urllib.request import Request
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request, Depends
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
 from uuid import UUID, uuid4
@@ -10,38 +10,90 @@ import os
 import asyncpg
 from dotenv import load_dotenv
 import re
-from bs4 import BeautifulSoup
-import requests
+from lxml import html
+import httpx
 import ell
-from urllib.parse import urlparse
+import openai
+import orjson
+from jiter import from_json
 import json
 import logging
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
 from contextlib import asynccontextmanager
+from datetime import timedelta
+from llm_cache import ResponseCache, cache_key, canonicalize
 
 load_dotenv()
 
+async def init_connection(conn: asyncpg.Connection):
+    # Writes take JSON text (e.g. from model_dump_json) as-is; reads decode to Python objects
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=lambda value: value,
+            decoder=json.loads,
+            schema="pg_catalog",
+            format="text"
+        )
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Setup
-    global db_pool
-    db_pool = await asyncpg.create_pool(
-        os.getenv("DATABASE_URL"),
-        min_size=2,
-        max_size=10
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        raise RuntimeError("DATABASE_URL not set")
+    # Every uvicorn worker opens its own pool, so by default the workers split
+    # DB_MAX_CONNECTIONS between them instead of each taking a fixed size
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    max_size = int(os.getenv(
+        "DB_POOL_MAX_SIZE",
+        max(2, int(os.getenv("DB_MAX_CONNECTIONS", "80")) // workers)
+    ))
+    min_size = min(int(os.getenv("DB_POOL_MIN_SIZE", "1")), max_size)
+    app.state.pool = await asyncpg.create_pool(
+        db_url,
+        min_size=min_size,
+        max_size=max_size,
+        statement_cache_size=2048,
+        max_cached_statement_lifetime=0,
+        init=init_connection
+    )
+    app.state.http = httpx.AsyncClient(
+        timeout=30,
+        http2=True,
+        # Jina and the pages it proxies may redirect; a 3xx is not a failure
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
     )
+    cache_ttl = timedelta(hours=int(os.getenv("LLM_CACHE_TTL_HOURS", "168")))
+    app.state.analysis_cache = ResponseCache(
+        "analysis",
+        AnalysisResponse,
+        semantic=os.getenv("SEMANTIC_CACHE_ENABLED") == "1",
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.87")),
+        store_dir=os.getenv("SEMANTIC_CACHE_DIR", "./llm_cache_store"),
+        ttl=cache_ttl
+    )
+    # Conversation turns are only ever reused on an exact match
+    app.state.conversation_cache = ResponseCache("conversation", ConversationUpdate, ttl=cache_ttl)
+    app.state.analysis_cache.load()
+    app.state.conversation_cache.load()
+    app.state.analyze_slots = asyncio.Semaphore(int(os.getenv("ANALYZE_CONCURRENCY", "8")))
+    app.state.message_slots = asyncio.Semaphore(int(os.getenv("MESSAGE_CONCURRENCY", "8")))
+    app.state.openai = None
     yield
     # Cleanup
-    if db_pool:
-        await db_pool.close()
-
-app = FastAPI(lifespan=lifespan)
+    if app.state.openai is not None:
+        await app.state.openai.close()
+    app.state.analysis_cache.save()
+    app.state.conversation_cache.save()
+    await app.state.http.aclose()
+    await app.state.pool.close()
 
-@app.middleware("http")
-async def debug_middleware(request: Request, call_next):
-    print(f"Request headers: {request.headers}")
-    response = await call_next(request)
-    print(f"Response headers: {response.headers}")
-    return response
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -58,14 +110,90 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Database connection pool
-async def get_db_pool():
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
-        logger.error("DATABASE_URL not set")
-        raise HTTPException(status_code=500, detail="Database configuration error")
-    logger.info(f"Connecting to database at: {db_url.split('@')[-1]}")  # Log host/port, not credentials
-    return await asyncpg.create_pool(db_url)
+# Request logging is opt-in: DEBUG_HTTP=1 logs method, path and status,
+# DEBUG_HTTP=headers also logs request and response headers
+DEBUG_HTTP = os.getenv("DEBUG_HTTP")
+if DEBUG_HTTP:
+    logger.setLevel(logging.DEBUG)
+
+    @app.middleware("http")
+    async def debug_middleware(request: Request, call_next):
+        logger.debug("Request %s %s", request.method, request.url.path)
+        if DEBUG_HTTP == "headers":
+            logger.debug("Request headers: %s", request.headers)
+        response = await call_next(request)
+        logger.debug("Response %s for %s %s", response.status_code, request.method, request.url.path)
+        if DEBUG_HTTP == "headers":
+            logger.debug("Response headers: %s", response.headers)
+        return response
+
+# Database connection pool (created once in lifespan)
+async def get_pool(request: Request) -> asyncpg.Pool:
+    return request.app.state.pool
+
+# Shared HTTP client (created once in lifespan)
+async def get_http(request: Request) -> httpx.AsyncClient:
+    return request.app.state.http
+
+# LLM response caches (created once in lifespan)
+async def get_analysis_cache(request: Request) -> ResponseCache:
+    return request.app.state.analysis_cache
+
+async def get_conversation_cache(request: Request) -> ResponseCache:
+    return request.app.state.conversation_cache
+
+# OpenAI client for requests that ask for a streamed reply (Accept:
+# text/event-stream), which ell's structured calls can't produce; None for
+# everything else. Created on first use so, as with ell, no key is needed to start
+async def get_stream_client(request: Request) -> Optional[openai.AsyncOpenAI]:
+    if "text/event-stream" not in request.headers.get("accept", ""):
+        return None
+    if request.app.state.openai is None:
+        request.app.state.openai = openai.AsyncOpenAI()
+    return request.app.state.openai
+
+# Admission control for the endpoints that call Jina and OpenAI: excess
+# requests queue for a slot and are rejected only if none frees up in time
+ADMISSION_TIMEOUT = float(os.getenv("ADMISSION_TIMEOUT", "10"))
+
+class AdmissionSlot:
+    """A slot held for one request. Route dependencies exit before a streamed
+    body is sent, so a streaming endpoint calls hand_off() and releases the
+    slot itself once the stream ends."""
+
+    def __init__(self, slots: asyncio.Semaphore):
+        self._slots = slots
+        self._released = False
+        self.handed_off = False
+
+    def hand_off(self):
+        self.handed_off = True
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._slots.release()
+
+@asynccontextmanager
+async def admit(slots: asyncio.Semaphore):
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=ADMISSION_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
+    slot = AdmissionSlot(slots)
+    try:
+        yield slot
+    finally:
+        if not slot.handed_off:
+            slot.release()
+
+async def analyze_admission(request: Request):
+    async with admit(request.app.state.analyze_slots) as slot:
+        yield slot
+
+async def message_admission(request: Request):
+    async with admit(request.app.state.message_slots) as slot:
+        yield slot
 
 # Models
 class AnalyzeRequest(BaseModel):
@@ -92,16 +220,18 @@ class WorldModel(BaseModel):
     questions: List[str] = Field(default_factory=list, description="Open questions to explore")
     summary: str = Field(description="Current summary of the discussion")
 
+# The model writes fields in this order, so the text shown to the user comes
+# first and can be streamed before the world model is generated
 class AnalysisResponse(BaseModel):
-    world_model: WorldModel = Field(description="The current state of understanding")
     response: str = Field(description="The response to the user")
     follow_up: str = Field(description="A follow-up question to continue the conversation")
+    world_model: WorldModel = Field(description="The current state of understanding")
 
 class ConversationUpdate(BaseModel):
-    updated_world_model: WorldModel = Field(description="The updated state of understanding")
     response: str = Field(description="The response to the user")
     follow_up: str = Field(description="A follow-up question to continue the conversation")
     referenced_content: Optional[str] = Field(description="Any new content that was referenced")
+    updated_world_model: WorldModel = Field(description="The updated state of understanding")
 
 class MessageRequest(BaseModel):
     message: str
@@ -112,19 +242,31 @@ if os.getenv("ENV") != "prod":
     ell.init(store='./ell_store', autocommit=True)
 
 JINA_READER_URL = "https://r.jina.ai/"
+YOUTUBE_RE = re.compile(r'(?:youtube\.com|youtu\.be)', re.I)
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.aac', '.ogg', '.wav')
+
 # Media processing functions
 def is_youtube_url(url: str) -> bool:
-    youtube_regex = r'(youtube\.com|youtu\.be)'
-    return bool(re.search(youtube_regex, url))
+    return YOUTUBE_RE.search(url) is not None
 
 def is_podcast_url(url: str) -> bool:
-    return urlparse(url).path.lower().endswith('.mp3')
+    path = url.split('?', 1)[0].split('#', 1)[0].lower()
+    return path.endswith(AUDIO_EXTENSIONS)
 
-async def process_webpage(url: str) -> str:
+async def process_webpage(url: str, http: httpx.AsyncClient) -> str:
     try:
-        response = requests.get(JINA_READER_URL + url,)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        return soup.get_text(strip=True)
+        response = await http.get(JINA_READER_URL + url)
+        # Fail on Jina errors (e.g. 429/5xx) rather than analyzing, and caching, the error page
+        response.raise_for_status()
+        # lxml rejects empty documents, which BeautifulSoup treated as no text
+        if not response.content.strip():
+            return ""
+        # Only the text is needed, so skip building a BeautifulSoup tree. Parse
+        # bytes, since lxml refuses str input that carries an encoding
+        # declaration, and decode them with the charset httpx detected
+        parser = html.HTMLParser(encoding=response.encoding or "utf-8")
+        doc = html.fromstring(response.content, parser=parser)
+        return " ".join(doc.text_content().split())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process webpage: {str(e)}")
 
@@ -136,7 +278,7 @@ async def process_podcast(url: str) -> str:
     # TODO: Implement actual podcast transcription
     return f"Placeholder: Podcast transcript for {url}"
 
-async def process_media(url: str) -> dict:
+async def fetch_media(url: str, http: httpx.AsyncClient) -> dict:
     if is_youtube_url(url):
         content = await process_youtube(url)
         media_type = "video"
@@ -144,12 +286,99 @@ async def process_media(url: str) -> dict:
         content = await process_podcast(url)
         media_type = "podcast"
     else:
-        content = await process_webpage(url)
+        content = await process_webpage(url, http)
         media_type = "webpage"
         
     return {"type": media_type, "content": content}
 
+# Processed content is cached by URL, in-process first and then in Postgres,
+# so repeat analyses of the same page skip the Jina fetch
+CONTENT_CACHE_TTL = timedelta(hours=24)
+CONTENT_CACHE_MAX_ENTRIES = 1024
+_content_cache: "OrderedDict[str, tuple]" = OrderedDict()  # url hash -> (expires at, processed)
+
+async def process_media(url: str, http: httpx.AsyncClient, pool: asyncpg.Pool) -> dict:
+    url = url.strip()
+    url_hash = hashlib.sha256(url.encode()).hexdigest()
+    
+    cached = _content_cache.get(url_hash)
+    if cached and cached[0] > time.monotonic():
+        _content_cache.move_to_end(url_hash)
+        return cached[1]
+    
+    # A Postgres hit only stays in-process for what is left of its own TTL
+    row = await pool.fetchrow('''
+        SELECT media_type, content,
+               EXTRACT(EPOCH FROM fetched_at + $2::interval - now()) AS ttl_seconds
+        FROM url_content
+        WHERE url_hash = $1 AND fetched_at > now() - $2::interval
+    ''', url_hash, CONTENT_CACHE_TTL)
+    if row:
+        processed = {"type": row["media_type"], "content": row["content"]}
+        ttl_seconds = float(row["ttl_seconds"])
+    else:
+        processed = await fetch_media(url, http)
+        await pool.execute('''
+            INSERT INTO url_content (url_hash, url, media_type, content, fetched_at)
+            VALUES ($1, $2, $3, $4, now())
+            ON CONFLICT (url_hash) DO UPDATE
+            SET media_type = EXCLUDED.media_type, content = EXCLUDED.content, fetched_at = EXCLUDED.fetched_at
+        ''', url_hash, url, processed["type"], processed["content"])
+        ttl_seconds = CONTENT_CACHE_TTL.total_seconds()
+    
+    _content_cache[url_hash] = (time.monotonic() + ttl_seconds, processed)
+    if len(_content_cache) > CONTENT_CACHE_MAX_ENTRIES:
+        _content_cache.popitem(last=False)
+    return processed
+
+# Most recent messages included in the prompt when continuing a conversation
+MESSAGE_HISTORY_LIMIT = 40
+
 # LLM integration using ell
+# Prompts put stable text first and per-request text last so provider-side
+# prompt caching can reuse the longest possible prefix.
+ANALYZE_INSTRUCTIONS = (
+    "You are an expert analyst creating a structured analysis from content and user insights. "
+    "Create a structured analysis with world model, response, and follow-up question."
+)
+CONTINUE_INSTRUCTIONS = "You are an expert analyst continuing a structured conversation."
+# Cached responses are keyed on the instructions and this version. Bump it
+# when a prompt changes in any other way (message layout, labels, response
+# models) so stale responses stop matching
+PROMPT_VERSION = 2
+# System messages are identical on every call, so build them once
+ANALYZE_SYSTEM = ell.system(ANALYZE_INSTRUCTIONS)
+CONTINUE_SYSTEM = ell.system(CONTINUE_INSTRUCTIONS)
+
+def analyze_prompt(content: str, initial_thought: str) -> list:
+    return [
+        ANALYZE_SYSTEM,
+        ell.user(["Content:", content]),
+        ell.user(["User's Initial Thought:", initial_thought])
+    ]
+
+def continue_prompt(
+    current_world_model_json: str,
+    message_history: list,
+    new_content: Optional[str] = None
+) -> list:
+    # History goes ahead of the world model, which changes on every turn. Until a
+    # conversation passes MESSAGE_HISTORY_LIMIT messages the history only grows,
+    # so consecutive turns share it as a prefix; after that the window slides
+    # and only the system message is a shared prefix
+    prompt = [
+        CONTINUE_SYSTEM,
+        ell.user("Message History:\n" + "\n".join([
+            f"{msg['role']}: {msg['content']}" for msg in message_history
+        ])),
+        ell.user(["Current World Model:", current_world_model_json])
+    ]
+    
+    if new_content:
+        prompt.append(ell.user(f"New content to analyze:\n{new_content}"))
+    
+    return prompt
+
 @ell.complex(model="gpt-4o-mini", response_format=AnalysisResponse)
 def analyze_content(content: str, initial_thought: str) -> AnalysisResponse:
     """You are an expert analyst. Your task is to:
@@ -163,18 +392,11 @@ def analyze_content(content: str, initial_thought: str) -> AnalysisResponse:
     4. Provide an engaging response that shows understanding
     5. Ask a relevant follow-up question
     """
-    return [
-        ell.system("You are an expert analyst creating a structured analysis from content and user insights."),
-        ell.user([
-            "Content:", content,
-            "\nUser's Initial Thought:", initial_thought,
-            "\nCreate a structured analysis with world model, response, and follow-up question."
-        ])
-    ]
+    return analyze_prompt(content, initial_thought)
 
 @ell.complex(model="gpt-4o-mini", response_format=ConversationUpdate)
 def continue_conversation(
-    current_world_model: WorldModel,
+    current_world_model_json: str,
     message_history: list,
     new_content: Optional[str] = None
 ) -> ConversationUpdate:
@@ -185,74 +407,165 @@ def continue_conversation(
     4. Provide an engaging response that builds on previous context
     5. Ask a relevant follow-up question
     """
-    prompt = [
-        ell.system("You are an expert analyst continuing a structured conversation."),
-        ell.user([
-            "Current World Model:", json.dumps(current_world_model.dict(), indent=2),
-            "\nMessage History:\n" + "\n".join([
-                f"{msg['role']}: {msg['content']}" for msg in message_history
-            ])
-        ])
-    ]
-    
-    if new_content:
-        prompt.append(ell.user(f"New content to analyze:\n{new_content}"))
-    
-    return prompt
+    return continue_prompt(current_world_model_json, message_history, new_content)
+
+# Streamed replies skip ell and call OpenAI's structured-output streaming
+# directly with the same prompts
+async def stream_llm(openai_client: openai.AsyncOpenAI, prompt: list, response_format: type):
+    """Yield the assistant message text as the model writes it, then the parsed response."""
+    sent = ""
+    async with openai_client.beta.chat.completions.stream(
+        model="gpt-4o-mini",
+        messages=[{"role": msg.role, "content": msg.text_only} for msg in prompt],
+        response_format=response_format
+    ) as stream:
+        async for event in stream:
+            if event.type != "content.delta" or not event.snapshot:
+                continue
+            # event.parsed leaves out strings that are still being written
+            partial = from_json(event.snapshot.encode(), partial_mode="trailing-strings")
+            text = partial.get("response", "")
+            if "follow_up" in partial:
+                text += "\n\n" + partial["follow_up"]
+            if len(text) > len(sent) and text.startswith(sent):
+                yield text[len(sent):]
+                sent = text
+        completion = await stream.get_final_completion()
+    message = completion.choices[0].message
+    if message.parsed is None:
+        raise RuntimeError(f"Model refused to respond: {message.refusal}")
+    yield message.parsed
+
+def assistant_message(reply) -> str:
+    return f"{reply.response}\n\n{reply.follow_up}"
+
+def sse(event: str, data) -> bytes:
+    return f"event: {event}\ndata: ".encode() + orjson.dumps(data) + b"\n\n"
+
+async def sse_reply(slot: AdmissionSlot, replies, finish):
+    """Relay a streamed reply as server-sent events.
+
+    Sends ``delta`` events with the assistant message text as it is generated,
+    then a ``done`` event with what ``finish`` returns once it has stored the
+    reply, or an ``error`` event.
+    """
+    try:
+        reply = None
+        streamed = False
+        async for item in replies:
+            if isinstance(item, str):
+                streamed = True
+                yield sse("delta", {"text": item})
+            else:
+                reply = item
+        if not streamed:
+            # Cache hit: the whole message is known up front
+            yield sse("delta", {"text": assistant_message(reply)})
+        yield sse("done", await finish(reply))
+    except Exception as e:
+        logger.error(f"Error streaming reply: {str(e)}", exc_info=True)
+        yield sse("error", {"detail": str(e)})
+    finally:
+        slot.release()
+
+def stream_reply(slot: AdmissionSlot, replies, finish) -> StreamingResponse:
+    slot.hand_off()
+    return StreamingResponse(
+        sse_reply(slot, replies, finish),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+        # Releases the slot if the client goes away before the stream starts
+        background=BackgroundTask(slot.release)
+    )
 
 @app.post("/api/analyze")
-async def analyze_media(request: AnalyzeRequest):
+async def analyze_media(
+    request: AnalyzeRequest,
+    slot: AdmissionSlot = Depends(analyze_admission),
+    pool: asyncpg.Pool = Depends(get_pool),
+    http: httpx.AsyncClient = Depends(get_http),
+    analysis_cache: ResponseCache = Depends(get_analysis_cache),
+    stream_client: Optional[openai.AsyncOpenAI] = Depends(get_stream_client)
+):
     logger.info(f"Starting analysis for URL: {request.url}")
-    pool = await get_db_pool()
-    async with pool.acquire() as conn:
-        try:
-            # Process media
-            logger.info("Processing media content...")
-            processed_content = await process_media(request.url)
-            logger.info(f"Media processed. Type: {processed_content['type']}")
-            
-            # Get AI analysis using ell
-            logger.info("Getting AI analysis...")
-            analysis_response = analyze_content(processed_content["content"], request.initialThought)
-            
-            # Extract structured response
-            analysis_data = analysis_response.parsed
-            logger.info("AI analysis completed with structured output")
-            
-            # Create conversation
-            conversation_id = uuid4()
-            logger.info(f"Creating conversation with ID: {conversation_id}")
-            
-            # Store the world model and conversation data
-            await conn.execute('''
-                INSERT INTO conversations (id, url, media_type, user_insight, ai_analysis, world_model)
-                VALUES ($1, $2, $3, $4, $5, $6)
-            ''', conversation_id, request.url, processed_content["type"], 
-                request.initialThought, analysis_data.response, 
-                json.dumps(analysis_data.world_model.dict()))
-            
-            # Create initial messages
-            logger.info("Creating initial messages...")
-            await conn.execute('''
-                INSERT INTO messages (id, conversation_id, role, content)
-                VALUES ($1, $2, $3, $4)
-            ''', uuid4(), conversation_id, "user", request.initialThought)
-            
-            # Combine response and follow-up
-            ai_message = f"{analysis_data.response}\n\n{analysis_data.follow_up}"
-            await conn.execute('''
-                INSERT INTO messages (id, conversation_id, role, content)
-                VALUES ($1, $2, $3, $4)
-            ''', uuid4(), conversation_id, "assistant", ai_message)
-            
+    try:
+        # Process media
+        logger.info("Processing media content...")
+        processed_content = await process_media(request.url, http, pool)
+        logger.info(f"Media processed. Type: {processed_content['type']}")
+        
+        prompt = {
+            "model": "gpt-4o-mini",
+            "prompt_version": PROMPT_VERSION,
+            "instructions": ANALYZE_INSTRUCTIONS,
+            "content": processed_content["content"],
+            "thought": request.initialThought
+        }
+        # Similar thoughts about the same content, under the same prompt,
+        # can share an analysis
+        similar = dict(
+            semantic_text=request.initialThought,
+            scope=cache_key(canonicalize({
+                "prompt_version": PROMPT_VERSION,
+                "instructions": ANALYZE_INSTRUCTIONS,
+                "content": processed_content["content"]
+            }))
+        )
+        
+        async def store(analysis_data: AnalysisResponse) -> str:
+            # Store the conversation and its initial messages in a single round trip.
+            # Both messages share the statement's now(), so offset them to keep order.
+            logger.info("Storing conversation and initial messages...")
+            conversation_id = await pool.fetchval('''
+                WITH conversation AS (
+                    INSERT INTO conversations (url, media_type, user_insight, ai_analysis, world_model)
+                    VALUES ($1, $2, $3, $4, $5)
+                    RETURNING id
+                )
+                INSERT INTO messages (conversation_id, role, content, timestamp)
+                SELECT conversation.id, m.role, m.content, now() + m.ord * interval '1 microsecond'
+                FROM conversation, (VALUES
+                    ('user', $3, 0),
+                    ('assistant', $6, 1)
+                ) AS m(role, content, ord)
+                RETURNING conversation_id
+            ''', request.url, processed_content["type"],
+                request.initialThought, analysis_data.response,
+                analysis_data.world_model.model_dump_json(), assistant_message(analysis_data))
+            logger.info(f"Created conversation with ID: {conversation_id}")
             return str(conversation_id)
-        except Exception as e:
-            logger.error(f"Error during analysis: {str(e)}", exc_info=True)
-            raise HTTPException(status_code=500, detail=str(e))
+        
+        if stream_client is not None:
+            logger.info("Streaming AI analysis...")
+            return stream_reply(slot, analysis_cache.stream_or_compute(
+                prompt,
+                lambda: stream_llm(
+                    stream_client,
+                    analyze_prompt(processed_content["content"], request.initialThought),
+                    AnalysisResponse
+                ),
+                pool,
+                **similar
+            ), store)
+        
+        # Get AI analysis using ell
+        logger.info("Getting AI analysis...")
+        analysis_data = await analysis_cache.get_or_compute(
+            prompt,
+            lambda: analyze_content(processed_content["content"], request.initialThought).parsed,
+            pool,
+            **similar
+        )
+        logger.info("AI analysis completed with structured output")
+        
+        return await store(analysis_data)
+    except Exception as e:
+        logger.error(f"Error during analysis: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/conversations/{conversation_id}")
-async def get_conversation(conversation_id: UUID):
-    async with db_pool.acquire() as conn:
+async def get_conversation(conversation_id: UUID, pool: asyncpg.Pool = Depends(get_pool)):
+    async with pool.acquire() as conn:
         messages = await conn.fetch('''
             SELECT id, conversation_id, role, content, timestamp
             FROM messages
@@ -260,19 +573,20 @@ async def get_conversation(conversation_id: UUID):
             ORDER BY timestamp ASC
         ''', conversation_id)
         
-        return [dict(msg) for msg in messages]
+        # Returned directly so orjson encodes the UUIDs and datetimes without
+        # a jsonable_encoder pass first
+        return ORJSONResponse([dict(msg) for msg in messages])
 
 @app.post("/api/share")
-async def share_conversation(request: ShareRequest):
-    pool = await get_db_pool()
+async def share_conversation(request: ShareRequest, pool: asyncpg.Pool = Depends(get_pool)):
     async with pool.acquire() as conn:
         # Check if conversation exists
-        conversation = await conn.fetchrow('''
-            SELECT id FROM conversations WHERE id = $1
+        exists = await conn.fetchval('''
+            SELECT 1 FROM conversations WHERE id = $1
         ''', request.conversationId)
         
-        if not conversation:
-            raise HTTPException(status_code=404, message="Conversation not found")
+        if not exists:
+            raise HTTPException(status_code=404, detail="Conversation not found")
         
         # Generate share URL (you might want to implement a more sophisticated system)
         share_url = f"/share/{request.conversationId}"
@@ -281,8 +595,7 @@ async def share_conversation(request: ShareRequest):
 
 # Webhook handling
 @app.post("/api/webhooks")
-async def create_webhook(url: str, events: List[str], secret: str):
-    pool = await get_db_pool()
+async def create_webhook(url: str, events: List[str], secret: str, pool: asyncpg.Pool = Depends(get_pool)):
     async with pool.acquire() as conn:
         webhook_id = uuid4()
         await conn.execute('''
@@ -297,64 +610,78 @@ async def dispatch_webhook(event: str, payload: dict):
 
 # Add endpoint for continuing conversation
 @app.post("/api/conversations/{conversation_id}/messages")
-async def add_message(conversation_id: str, request: MessageRequest):
+async def add_message(
+    conversation_id: str,
+    request: MessageRequest,
+    slot: AdmissionSlot = Depends(message_admission),
+    pool: asyncpg.Pool = Depends(get_pool),
+    http: httpx.AsyncClient = Depends(get_http),
+    conversation_cache: ResponseCache = Depends(get_conversation_cache),
+    stream_client: Optional[openai.AsyncOpenAI] = Depends(get_stream_client)
+):
     conversation_id = UUID(conversation_id)
-    pool = await get_db_pool()
-    async with pool.acquire() as conn:
+    # Start fetching new content right away so it overlaps with the DB work below
+    media_task = asyncio.create_task(process_media(request.url, http, pool)) if request.url else None
+    try:
+        # Save user message; the FK on conversation_id rejects unknown conversations
         try:
-            # Process new content if URL provided
-            new_content = None
-            if request.url:
-                processed = await process_media(request.url)
-                new_content = processed["content"]
-            
-            # Save user message
-            msg_id = uuid4()
-            await conn.execute('''
-                INSERT INTO messages (id, conversation_id, role, content)
-                VALUES ($1, $2, $3, $4)
-            ''', msg_id, conversation_id, "user", request.message)
-            
-            # Get conversation context
-            conversation = await conn.fetchrow('''
-                SELECT * FROM conversations WHERE id = $1
-            ''', conversation_id)
-            
-            if not conversation:
-                raise HTTPException(status_code=404, detail="Conversation not found")
-            
-            # Get message history
-            messages = await conn.fetch('''
-                SELECT * FROM messages 
+            msg_id = await pool.fetchval('''
+                INSERT INTO messages (conversation_id, role, content)
+                VALUES ($1, $2, $3)
+                RETURNING id
+            ''', conversation_id, "user", request.message)
+        except asyncpg.ForeignKeyViolationError:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        
+        # Get conversation context and message history concurrently
+        # world_model is cast to text so it reaches the prompt without being decoded
+        world_model_json, messages = await asyncio.gather(
+            pool.fetchval('''
+                SELECT world_model::text FROM conversations WHERE id = $1
+            ''', conversation_id),
+            pool.fetch('''
+                SELECT role, content FROM messages 
                 WHERE conversation_id = $1 
-                ORDER BY timestamp ASC
-            ''', conversation_id)
-            
-            # Continue conversation using ell
-            current_world_model = WorldModel(**json.loads(conversation["world_model"]))
-            response = continue_conversation(
-                current_world_model,
-                [{"role": m["role"], "content": m["content"]} for m in messages],
-                new_content
-            )
-            
-            # Extract structured response
-            update_data = response.parsed
-            
-            # Update world model
-            await conn.execute('''
-                UPDATE conversations 
-                SET world_model = $1 
-                WHERE id = $2
-            ''', json.dumps(update_data.updated_world_model.dict()), conversation_id)
-            
-            # Save AI response
-            ai_message = f"{update_data.response}\n\n{update_data.follow_up}"
-            ai_msg_id = uuid4()
-            await conn.execute('''
-                INSERT INTO messages (id, conversation_id, role, content)
-                VALUES ($1, $2, $3, $4)
-            ''', ai_msg_id, conversation_id, "assistant", ai_message)
+                ORDER BY timestamp DESC
+                LIMIT $2
+            ''', conversation_id, MESSAGE_HISTORY_LIMIT)
+        )
+        
+        if world_model_json is None:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        
+        # Process new content if URL provided
+        new_content = None
+        if media_task:
+            processed = await media_task
+            new_content = processed["content"]
+        
+        message_history = [{"role": m["role"], "content": m["content"]} for m in reversed(messages)]
+        # Exact matches only: the user message is stored before the lookup,
+        # so a rephrased retry never sees the same conversation state again
+        prompt = {
+            "model": "gpt-4o-mini",
+            "prompt_version": PROMPT_VERSION,
+            "instructions": CONTINUE_INSTRUCTIONS,
+            "world_model": world_model_json,
+            "messages": message_history,
+            "new_content": new_content
+        }
+        
+        async def store(update_data: ConversationUpdate) -> dict:
+            # Update world model and save AI response in a single round trip
+            ai_message = assistant_message(update_data)
+            ai_msg_id = await pool.fetchval('''
+                WITH updated AS (
+                    UPDATE conversations 
+                    SET world_model = $1 
+                    WHERE id = $2
+                )
+                INSERT INTO messages (conversation_id, role, content)
+                VALUES ($2, $3, $4)
+                RETURNING id
+            ''', update_data.updated_world_model.model_dump_json(), conversation_id,
+                "assistant", ai_message)
             
             return {
                 "messages": [
@@ -374,15 +701,43 @@ async def add_message(conversation_id: str, request: MessageRequest):
                     }
                 ]
             }
-            
-        except Exception as e:
-            logger.error(f"Error adding message: {str(e)}", exc_info=True)
-            raise HTTPException(status_code=500, detail=str(e))
+        
+        if stream_client is not None:
+            return stream_reply(slot, conversation_cache.stream_or_compute(
+                prompt,
+                lambda: stream_llm(
+                    stream_client,
+                    continue_prompt(world_model_json, message_history, new_content),
+                    ConversationUpdate
+                ),
+                pool
+            ), store)
+        
+        # Continue conversation using ell
+        update_data = await conversation_cache.get_or_compute(
+            prompt,
+            lambda: continue_conversation(world_model_json, message_history, new_content).parsed,
+            pool
+        )
+        return await store(update_data)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error adding message: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if media_task:
+            if media_task.done() and not media_task.cancelled():
+                # Mark a fetch that failed while we bailed out early as seen
+                media_task.exception()
+            else:
+                media_task.cancel()
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error(f"Global error: {exc}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": str(exc)},
         headers={
@@ -398,4 +753,14 @@ async def health():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=3001)
+    # Exported so each worker can size its share of the DB connections
+    os.environ.setdefault("WEB_CONCURRENCY", str(os.cpu_count() * 2 + 1))
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=3001,
+        workers=int(os.environ["WEB_CONCURRENCY"]),
+        loop="uvloop",
+        http="httptools",
+        log_level="info"
+    )
@@ -0,0 +1,31 @@
+"""add llm cache
+
+Revision ID: 3b1f6c2d9a4e
+Revises: xxxx
+Create Date: 2026-10-14 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '3b1f6c2d9a4e'
+down_revision = 'xxxx'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('llm_cache',
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('namespace', sa.String(), nullable=False),
+        sa.Column('prompt', sa.String(), nullable=False),
+        sa.Column('embedding', sa.LargeBinary(), nullable=True),
+        sa.Column('response', postgresql.JSONB(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+def downgrade():
+    op.drop_table('llm_cache')
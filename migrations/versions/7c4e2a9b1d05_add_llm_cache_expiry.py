@@ -0,0 +1,24 @@
+"""add llm cache expiry
+
+Revision ID: 7c4e2a9b1d05
+Revises: 3b1f6c2d9a4e
+Create Date: 2026-10-14 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '7c4e2a9b1d05'
+down_revision = '3b1f6c2d9a4e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('llm_cache',
+        sa.Column('expires_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False)
+    )
+
+def downgrade():
+    op.drop_column('llm_cache', 'expires_at')
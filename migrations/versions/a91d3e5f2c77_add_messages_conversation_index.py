@@ -0,0 +1,22 @@
+"""add messages conversation index
+
+Revision ID: a91d3e5f2c77
+Revises: 7c4e2a9b1d05
+Create Date: 2026-10-14 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a91d3e5f2c77'
+down_revision = '7c4e2a9b1d05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_messages_conv_ts', 'messages', ['conversation_id', 'timestamp'])
+
+def downgrade():
+    op.drop_index('ix_messages_conv_ts', table_name='messages')
@@ -0,0 +1,34 @@
+"""server side uuid defaults
+
+Revision ID: d52b8f0e6a13
+Revises: a91d3e5f2c77
+Create Date: 2026-10-14 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd52b8f0e6a13'
+down_revision = 'a91d3e5f2c77'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # gen_random_uuid() is built in from PostgreSQL 13; only older servers need
+    # pgcrypto, which many managed services don't let ordinary roles install
+    op.execute("""
+        DO $$
+        BEGIN
+            IF current_setting('server_version_num')::int < 130000 THEN
+                CREATE EXTENSION IF NOT EXISTS pgcrypto;
+            END IF;
+        END $$
+    """)
+    op.alter_column('conversations', 'id', server_default=sa.text('gen_random_uuid()'))
+    op.alter_column('messages', 'id', server_default=sa.text('gen_random_uuid()'))
+
+def downgrade():
+    op.alter_column('messages', 'id', server_default=None)
+    op.alter_column('conversations', 'id', server_default=None)
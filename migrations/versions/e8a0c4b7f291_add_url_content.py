@@ -0,0 +1,29 @@
+"""add url content cache
+
+Revision ID: e8a0c4b7f291
+Revises: d52b8f0e6a13
+Create Date: 2026-10-14 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e8a0c4b7f291'
+down_revision = 'd52b8f0e6a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('url_content',
+        sa.Column('url_hash', sa.String(), nullable=False),
+        sa.Column('url', sa.String(), nullable=False),
+        sa.Column('media_type', sa.String(), nullable=False),
+        sa.Column('content', sa.String(), nullable=False),
+        sa.Column('fetched_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('url_hash')
+    )
+
+def downgrade():
+    op.drop_table('url_content')
@@ -0,0 +1,22 @@
+"""add llm cache expiry index
+
+Revision ID: f3c9d1a6b8e2
+Revises: e8a0c4b7f291
+Create Date: 2026-10-14 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f3c9d1a6b8e2'
+down_revision = 'e8a0c4b7f291'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_llm_cache_expires_at', 'llm_cache', ['expires_at'])
+
+def downgrade():
+    op.drop_index('ix_llm_cache_expires_at', table_name='llm_cache')
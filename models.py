@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, UUID, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, String, UUID, DateTime, JSON, ForeignKey, LargeBinary, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 
@@ -7,7 +8,7 @@ Base = declarative_base()
 class Conversation(Base):
     __tablename__ = "conversations"
     
-    id = Column(UUID, primary_key=True)
+    id = Column(UUID, primary_key=True, server_default=func.gen_random_uuid())
     url = Column(String, nullable=False)
     media_type = Column(String, nullable=False)
     user_insight = Column(String)
@@ -18,8 +19,36 @@ class Conversation(Base):
 class Message(Base):
     __tablename__ = "messages"
     
-    id = Column(UUID, primary_key=True)
+    id = Column(UUID, primary_key=True, server_default=func.gen_random_uuid())
     conversation_id = Column(UUID, ForeignKey("conversations.id"))
     role = Column(String, nullable=False)
     content = Column(String, nullable=False)
-    timestamp = Column(DateTime, server_default=func.now()) 
\ No newline at end of file
+    timestamp = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_messages_conv_ts", "conversation_id", "timestamp"),
+    )
+
+class LLMCache(Base):
+    __tablename__ = "llm_cache"
+
+    key = Column(String, primary_key=True)
+    namespace = Column(String, nullable=False)
+    prompt = Column(String, nullable=False)
+    embedding = Column(LargeBinary)
+    response = Column(JSONB, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    expires_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_llm_cache_expires_at", "expires_at"),
+    )
+
+class URLContent(Base):
+    __tablename__ = "url_content"
+
+    url_hash = Column(String, primary_key=True)
+    url = Column(String, nullable=False)
+    media_type = Column(String, nullable=False)
+    content = Column(String, nullable=False)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
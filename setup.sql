@@ -7,7 +7,7 @@ GRANT ALL PRIVILEGES ON DATABASE radar_demo TO myuser;
 \c radar_demo
 
 CREATE TABLE conversations (
-    id UUID PRIMARY KEY,
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     url TEXT NOT NULL,
     media_type TEXT NOT NULL,
     user_insight TEXT NOT NULL,
@@ -15,7 +15,7 @@ CREATE TABLE conversations (
 );
 
 CREATE TABLE messages (
-    id UUID PRIMARY KEY,
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     conversation_id UUID REFERENCES conversations(id),
     role TEXT NOT NULL,
     content TEXT NOT NULL,
@@ -30,3 +30,25 @@ CREATE TABLE webhooks (
 );
 
 ALTER TABLE conversations ADD COLUMN world_model JSONB;
+
+CREATE INDEX ix_messages_conv_ts ON messages (conversation_id, timestamp);
+
+CREATE TABLE llm_cache (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    embedding BYTEA,
+    response JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW(),
+    expires_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX ix_llm_cache_expires_at ON llm_cache (expires_at);
+
+CREATE TABLE url_content (
+    url_hash TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    media_type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    fetched_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);